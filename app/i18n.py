@@ -1,3 +1,5 @@
+from collections import ChainMap
+
 import streamlit as st
 
 # --- Translations -------------------------------------------------------------
@@ -9,13 +11,10 @@ TRANSLATIONS = {
         "std_dev_pct": "Price range (%)",
         "num_combos": "Number of Option Combinations",
         "option_n": "Option {n}",
-        "option_type": "Option Type",
         "position": "Position",
         "quantity": "Quantity",
         "premium": "Premium",
         "strike_price": "Strike Price",
-        "call": "Call",
-        "put": "Put",
         "long_call": "Long Call",
         "short_call": "Short Call",
         "long_put": "Long Put",
@@ -41,6 +40,7 @@ TRANSLATIONS = {
         "show_zero_line": "Show P/L = 0 line",
         "show_strike_lines": "Show strike lines",
         "show_underlying_line": "Show underlying price line",
+        "update": "Update",
 
     },
     "uk": {
@@ -50,13 +50,10 @@ TRANSLATIONS = {
         "std_dev_pct": "Диапазон цен (±%)",
         "num_combos": "Кількість комбінацій опціонів",
         "option_n": "Опціон {n}",
-        "option_type": "Тип опціону",
         "position": "Позиція",
         "quantity": "Кількість",
         "premium": "Премія",
         "strike_price": "Страйк",
-        "call": "Колл",
-        "put": "Пут",
         "long_call": "Покупка колла",
         "short_call": "Продаж колла",
         "long_put": "Покупка пута",
@@ -82,37 +79,46 @@ TRANSLATIONS = {
         "show_zero_line": "Показати лінію P/L = 0",
         "show_strike_lines": "Показати лінії страйків",
         "show_underlying_line": "Показати лінію поточної ціни",
+        "update": "Оновити",
 
     },
 }
 
+_LANG_OPTIONS = ["en", "uk"]
+_LANG_NAME_KEYS = {"en": "lang_en", "uk": "lang_uk"}
+_LANG_INDEX = {code: i for i, code in enumerate(_LANG_OPTIONS)}
+
 def get_lang() -> str:
     """Read ?lang=xx from URL or session; default 'en'."""
     qp = st.query_params
     if "lang" in qp and qp["lang"] in TRANSLATIONS:
-        st.session_state["lang"] = qp["lang"]
+        if qp["lang"] != st.session_state.get("lang", "en"):
+            st.session_state["lang"] = qp["lang"]
+            activate_lang()
     return st.session_state.get("lang", "en")
 
+def activate_lang() -> ChainMap:
+    """Resolve the current lang's table (English fallback) once per rerun."""
+    lang = st.session_state.get("lang", "en")
+    active = ChainMap(TRANSLATIONS.get(lang, {}), TRANSLATIONS["en"])
+    st.session_state["_t"] = active
+    return active
+
 def t(key: str, **fmt) -> str:
     """Translate a key using current lang; fallback to English."""
-    lang = st.session_state.get("lang", "en")
-    d = TRANSLATIONS.get(lang, TRANSLATIONS["en"])
-    s = d.get(key, TRANSLATIONS["en"].get(key, key))
+    active = st.session_state.get("_t") or activate_lang()
+    s = active.get(key, key)
     return s.format(**fmt) if fmt else s
 
 def language_selector():
     """Render language switcher in sidebar and keep URL in sync."""
     lang_code = get_lang()
-    # Show names in the currently selected language
-    lang_names = {
-        "en": TRANSLATIONS[lang_code]["lang_en"],
-        "uk": TRANSLATIONS[lang_code]["lang_uk"],
-    }
     chosen = st.selectbox(
         t("language"),
-        options=["en", "uk"],
-        index=["en", "uk"].index(lang_code),
-        format_func=lambda code: lang_names[code],
+        options=_LANG_OPTIONS,
+        index=_LANG_INDEX[lang_code],
+        # Show names in the currently selected language
+        format_func=lambda code: t(_LANG_NAME_KEYS[code]),
         key="lang_select",
     )
     if chosen != st.session_state.get("lang", "en"):
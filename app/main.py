@@ -1,73 +1,110 @@
 # app/main.py
-from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from dataclasses import astuple, dataclass, field
+from typing import Dict, List, Sequence, Tuple
 
 import numpy as np
 import plotly.graph_objects as go
 import streamlit as st
-from i18n import language_selector, t
+from i18n import activate_lang, language_selector, t
 
 COLOR_MAP = [
     "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
     "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf"
 ]
 # --------------------------- Data Model ---------------------------------------
-@dataclass
+@dataclass(frozen=True)
 class OptionLeg:
     type: str     # "CALL" | "PUT"
     pos: str      # "LONG_CALL" | "SHORT_CALL" | "LONG_PUT" | "SHORT_PUT"
     quantity: int
     premium: float
     strike: float
+    is_long: bool = field(init=False)  # derived from pos, keeps string checks off the hot path
+
+    def __post_init__(self):
+        object.__setattr__(self, "is_long", self.pos.startswith("LONG"))
 
 
 # --------------------------- Computation --------------------------------------
-def payoff(stock_price: float, leg: OptionLeg) -> float:
-    """Single-leg P/L at expiry."""
-    if leg.type == "CALL":
-        intrinsic = max(stock_price - leg.strike, 0.0)
-        is_long = (leg.pos == "LONG_CALL")
-    else:  # PUT
-        intrinsic = max(leg.strike - stock_price, 0.0)
-        is_long = (leg.pos == "LONG_PUT")
-    return (intrinsic - leg.premium) if is_long else (-intrinsic + leg.premium)
+def legs_to_arrays(legs: Sequence[OptionLeg]) -> Dict[str, np.ndarray]:
+    """Column-wise (SoA) view of the legs for vectorized evaluation."""
+    return {
+        "strikes": np.array([l.strike for l in legs], dtype=float),
+        "premiums": np.array([l.premium for l in legs], dtype=float),
+        "quantities": np.array([l.quantity for l in legs], dtype=float),
+        "is_call": np.array([l.type == "CALL" for l in legs], dtype=bool),
+        "is_long": np.array([l.is_long for l in legs], dtype=bool),
+    }
+
+
+def payoff_matrix(x: np.ndarray, arr: Dict[str, np.ndarray]) -> np.ndarray:
+    """Per-leg P/L at expiry, shape (n_legs, len(x)), quantity included.
 
+    Rows are legs, columns are prices. Works on the SoA arrays only, so the
+    whole portfolio is one broadcast with no per-leg Python loop.
+    """
+    strikes, prem, qty = arr["strikes"], arr["premiums"], arr["quantities"]
+    sign_type = np.where(arr["is_call"], 1.0, -1.0)
+    sign_pos = np.where(arr["is_long"], 1.0, -1.0)
 
+    # Single preallocated buffer, every step below writes into it in place.
+    leg_y = np.empty((strikes.shape[0], x.shape[0]), dtype=np.float64)
+    np.subtract(x[None, :], strikes[:, None], out=leg_y)
+    leg_y *= sign_type[:, None]
+    np.maximum(leg_y, 0.0, out=leg_y)          # intrinsic value
+    leg_y -= prem[:, None]                     # long-side P/L per unit
+    leg_y *= (sign_pos * qty)[:, None]         # flip shorts, scale by quantity
+    return leg_y
+
+
+@st.cache_data(max_entries=64)
 def compute_curve(
     underlying_price: float,
     std_dev_pct: float,
-    legs: List[OptionLeg],
+    legs: Tuple[OptionLeg, ...],
 ) -> Dict:
-    """Build x-grid and aggregate portfolio P/L curve + stats."""
+    """Build x-grid and aggregate portfolio P/L curve + stats.
+
+    Cached on its inputs, so reruns triggered by toggles or the language switch
+    skip the recompute.
+    """
     upper = underlying_price * (1 + std_dev_pct / 100.0)
     lower = underlying_price * (1 - std_dev_pct / 100.0)
-    x = np.linspace(lower, upper, 400)
-
-    y = []
-    for price in x:
-        total = 0.0
-        for leg in legs:
-            total += payoff(price, leg) * leg.quantity
-        y.append(total)
-
-    y_arr = np.asarray(y, dtype=float)
-    max_gain = float(np.max(y_arr))
-    min_gain = float(np.min(y_arr))
-    i_max = int(np.argmax(y_arr))
-    i_min = int(np.argmin(y_arr))
-
-    long_total = sum(l.premium * l.quantity for l in legs if l.pos.startswith("LONG"))
-    short_total = sum(l.premium * l.quantity for l in legs if l.pos.startswith("SHORT"))
-    total_cost = long_total - short_total
-
+    # P/L is piecewise linear with kinks only at strikes, so its extrema sit on
+    # the range ends or an in-range strike, and those points plus the
+    # underlying are enough to draw it exactly.
+    arr = legs_to_arrays(legs)
+    candidates = np.unique(np.clip(
+        np.concatenate(([lower, upper], arr["strikes"])), lower, upper
+    ))
+    x = np.union1d(candidates, [underlying_price])
+    leg_y = payoff_matrix(x, arr)
+    y_arr = leg_y.sum(axis=0)
+
+    # candidates are a subset of x, so their P/L is already in y_arr.
+    cand_idx = np.searchsorted(x, candidates)
+    cand_y = y_arr[cand_idx]
+    i_max = int(cand_idx[np.argmax(cand_y)])
+    i_min = int(cand_idx[np.argmin(cand_y)])
+    max_gain = float(y_arr[i_max])
+    min_gain = float(y_arr[i_min])
+
+    # Premium paid on longs minus premium received on shorts.
+    sign_pos = np.where(arr["is_long"], 1.0, -1.0)
+    total_cost = float((sign_pos * arr["premiums"] * arr["quantities"]).sum())
+
+    # Stats above use full precision; the curves only go to Plotly, where
+    # float32 halves the JSON payload with no visible difference.
     return {
-        "x": x,
-        "y": y_arr,
+        "x": x.astype(np.float32),
+        "y": y_arr.astype(np.float32),
+        "leg_y": leg_y.astype(np.float32),
         "max_gain": max_gain,
         "min_gain": min_gain,
         "i_max": i_max,
         "i_min": i_min,
         "total_cost": total_cost,
+        "strikes_sorted": np.unique(arr["strikes"]),
     }
 
 
@@ -78,13 +115,6 @@ def build_sidebar() -> Tuple[float, float, Dict[str, bool], List[OptionLeg]]:
         language_selector()
         st.header(t("inputs"))
 
-        underlying_price = st.number_input(
-            t("underlying_price"), min_value=1.0, max_value=1000.0, value=100.0, step=0.1
-        )
-        std_dev = st.number_input(
-            t("std_dev_pct"), min_value=0.0, max_value=100.0, value=10.0, step=0.1
-        )
-
         # Toggles for reference lines
         toggles = {
             "show_zero": st.checkbox(t("show_zero_line"), value=True, key="tgl_zero"),
@@ -96,12 +126,7 @@ def build_sidebar() -> Tuple[float, float, Dict[str, bool], List[OptionLeg]]:
         option_data: List[OptionLeg] = []
         option_count = st.number_input(t("num_combos"), min_value=1, max_value=10, value=1, step=1)
 
-        OPTION_TYPES = ["CALL", "PUT"]
-        POS_CALL = ["LONG_CALL", "SHORT_CALL"]
-        POS_PUT = ["LONG_PUT", "SHORT_PUT"]
-
-        def format_option_type(code: str) -> str:
-            return t("call") if code == "CALL" else t("put")
+        POSITIONS = ["LONG_CALL", "SHORT_CALL", "LONG_PUT", "SHORT_PUT"]
 
         def format_position(code: str) -> str:
             return {
@@ -111,82 +136,74 @@ def build_sidebar() -> Tuple[float, float, Dict[str, bool], List[OptionLeg]]:
                 "SHORT_PUT": t("short_put"),
             }[code]
 
-        for i in range(option_count):
-            st.subheader(t("option_n", n=i + 1))
-            opt_type_code = st.selectbox(
-                t("option_type"),
-                options=OPTION_TYPES,
-                format_func=format_option_type,
-                key=f"type_{i}",
+        # Price and leg edits are batched: the script reruns only on submit.
+        with st.form("inputs_form"):
+            underlying_price = st.number_input(
+                t("underlying_price"), min_value=1.0, max_value=1000.0, value=100.0, step=0.1
             )
-            pos_options = POS_CALL if opt_type_code == "CALL" else POS_PUT
-            pos_code = st.selectbox(
-                t("position"),
-                options=pos_options,
-                format_func=format_position,
-                key=f"pos_{i}",
+            std_dev = st.number_input(
+                t("std_dev_pct"), min_value=0.0, max_value=100.0, value=10.0, step=0.1
             )
-            quantity = st.number_input(t("quantity"), value=1, key=f"qty_{i}")
-            premium = st.number_input(t("premium"), min_value=0.0, value=5.0, step=0.1, key=f"prem_{i}")
-            strike_price = st.number_input(t("strike_price"), min_value=0.0, value=100.0, step=0.1, key=f"strike_{i}")
-
-            option_data.append(
-                OptionLeg(
-                    type=opt_type_code,
-                    pos=pos_code,
-                    quantity=int(quantity),
-                    premium=float(premium),
-                    strike=float(strike_price),
+
+            for i in range(option_count):
+                st.subheader(t("option_n", n=i + 1))
+                # One selector for the whole position: inside a form, a separate
+                # type selector could not refresh the position choices before submit.
+                pos_code = st.selectbox(
+                    t("position"),
+                    options=POSITIONS,
+                    format_func=format_position,
+                    key=f"pos_{i}",
                 )
-            )
+                opt_type_code = "CALL" if pos_code.endswith("CALL") else "PUT"
+                quantity = st.number_input(t("quantity"), value=1, key=f"qty_{i}")
+                premium = st.number_input(t("premium"), min_value=0.0, value=5.0, step=0.1, key=f"prem_{i}")
+                strike_price = st.number_input(t("strike_price"), min_value=0.0, value=100.0, step=0.1, key=f"strike_{i}")
+
+                option_data.append(
+                    OptionLeg(
+                        type=opt_type_code,
+                        pos=pos_code,
+                        quantity=int(quantity),
+                        premium=float(premium),
+                        strike=float(strike_price),
+                    )
+                )
+
+            st.form_submit_button(t("update"))
 
     return float(underlying_price), float(std_dev), toggles, option_data
 
 
-def draw_chart(
+def build_figure(
     x: np.ndarray,
     y: np.ndarray,
-    underlying_price: float,
-    std_dev_pct: float,
+    leg_y: np.ndarray,
     max_gain: float,
     min_gain: float,
     i_max: int,
     i_min: int,
     legs: List[OptionLeg],
-    toggles: Dict[str, bool],
-):
-    """Render the payoff chart with per-leg colored profiles and a bold net curve."""
+) -> go.Figure:
+    """Traces, markers and layout of the payoff chart (everything but shapes)."""
     fig = go.Figure()
 
-    # --- σ-band around underlying ------------------------------------------------
-    band = underlying_price * (std_dev_pct / 100.0)
-    fig.add_shape(
-        type="rect",
-        x0=underlying_price - band,
-        x1=underlying_price + band,
-        y0=min_gain,
-        y1=max_gain,
-        fillcolor="LightSkyBlue",
-        opacity=0.35,
-        layer="below",
-        line_width=0,
-    )
-
     # --- Individual legs (colored, dotted) --------------------------------------
-    for idx, leg in enumerate(legs[:10]):  # cap to first 10 legs for the palette
-        leg_y = [payoff(px, leg) * leg.quantity for px in x]
-        fig.add_trace(go.Scatter(
+    traces = [
+        go.Scatter(
             x=x,
-            y=leg_y,
+            y=leg_y[idx],
             mode="lines",
             name=f"{leg.pos} {leg.type} K={leg.strike:g}",
             line=dict(color=COLOR_MAP[idx % len(COLOR_MAP)], dash="dot", width=1.5),
             legendgroup="legs",
             hovertemplate="S=%{x:.2f}<br>P/L=%{y:.2f}<extra>%{fullData.name}</extra>",
-        ))
+        )
+        for idx, leg in enumerate(legs[:10])  # cap to first 10 legs for the palette
+    ]
 
     # --- Net payoff (bold, black) -----------------------------------------------
-    fig.add_trace(go.Scatter(
+    traces.append(go.Scatter(
         x=x,
         y=y,
         mode="lines",
@@ -196,6 +213,9 @@ def draw_chart(
         hovertemplate="S=%{x:.2f}<br>Net P/L=%{y:.2f}<extra></extra>",
     ))
 
+    # One batched call instead of an add_trace per leg.
+    fig.add_traces(traces)
+
     # --- Max/Min markers ---------------------------------------------------------
     fig.add_annotation(
         x=x[i_max], y=max_gain, text=t("max_gain"),
@@ -206,17 +226,6 @@ def draw_chart(
         showarrow=True, arrowhead=4, ax=0, ay=40
     )
 
-    # --- Reference lines ---------------------------------------------------------
-    if toggles.get("show_zero"):
-        fig.add_hline(y=0, line_width=1, line_dash="dash", line_color="gray")
-
-    if toggles.get("show_underlying"):
-        fig.add_vline(x=underlying_price, line_width=1.5, line_dash="solid", line_color="black")
-
-    if toggles.get("show_strikes") and legs:
-        for s in sorted({leg.strike for leg in legs}):
-            fig.add_vline(x=s, line_width=1, line_dash="dot", line_color="darkgreen")
-
     # --- Layout ------------------------------------------------------------------
     fig.update_layout(
         title=t("payoff_diagram"),
@@ -227,20 +236,101 @@ def draw_chart(
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="left", x=0),
         hovermode="x unified",
     )
+    return fig
+
+
+def draw_chart(
+    x: np.ndarray,
+    y: np.ndarray,
+    leg_y: np.ndarray,
+    underlying_price: float,
+    std_dev_pct: float,
+    max_gain: float,
+    min_gain: float,
+    i_max: int,
+    i_min: int,
+    legs: List[OptionLeg],
+    strikes_sorted: np.ndarray,
+    toggles: Dict[str, bool],
+):
+    """Render the payoff chart with per-leg colored profiles and a bold net curve."""
+    # The figure only depends on the curve inputs and the language; toggle
+    # changes reuse the last one and just re-apply the shapes below. Legs go
+    # in as plain tuples: each rerun re-executes this module, so OptionLeg is
+    # a new class every time and leg instances from different runs never
+    # compare equal.
+    fig_key = (
+        underlying_price,
+        std_dev_pct,
+        tuple(astuple(leg) for leg in legs),
+        st.session_state.get("lang", "en"),
+    )
+    cached = st.session_state.get("_fig")
+    if cached is not None and cached[0] == fig_key:
+        fig = cached[1]
+    else:
+        fig = build_figure(x, y, leg_y, max_gain, min_gain, i_max, i_min, legs)
+        st.session_state["_fig"] = (fig_key, fig)
+
+    # All shapes go in with a single assignment. Assigning (rather than
+    # update_layout, which merges into existing shapes) also drops whatever a
+    # reused figure carried. Full-span lines use axis-domain coords, the same
+    # as add_hline/add_vline.
+    band = underlying_price * (std_dev_pct / 100.0)
+    shapes = [
+        # --- σ-band around underlying --------------------------------------------
+        dict(
+            type="rect",
+            x0=underlying_price - band,
+            x1=underlying_price + band,
+            y0=min_gain,
+            y1=max_gain,
+            fillcolor="LightSkyBlue",
+            opacity=0.35,
+            layer="below",
+            line_width=0,
+        ),
+    ]
+
+    # --- Reference lines ---------------------------------------------------------
+    if toggles.get("show_zero"):
+        shapes.append(dict(
+            type="line", xref="x domain", x0=0, x1=1, yref="y", y0=0, y1=0,
+            line=dict(width=1, dash="dash", color="gray"),
+        ))
+
+    if toggles.get("show_underlying"):
+        shapes.append(dict(
+            type="line", xref="x", x0=underlying_price, x1=underlying_price, yref="y domain", y0=0, y1=1,
+            line=dict(width=1.5, dash="solid", color="black"),
+        ))
+
+    if toggles.get("show_strikes"):
+        shapes.extend(
+            dict(
+                type="line", xref="x", x0=s, x1=s, yref="y domain", y0=0, y1=1,
+                line=dict(width=1, dash="dot", color="darkgreen"),
+            )
+            for s in strikes_sorted.tolist()
+        )
+
+    fig.layout.shapes = shapes
 
     st.plotly_chart(fig, use_container_width=True)
 
 
 # --------------------------- App Entry ----------------------------------------
 def main():
+    activate_lang()
     st.title(t("app_title"))
 
     underlying_price, std_dev, toggles, legs = build_sidebar()
-    results = compute_curve(underlying_price, std_dev, legs)
+    results = compute_curve(underlying_price, std_dev, tuple(legs))
 
     draw_chart(
         x=results["x"],
         y=results["y"],
+        leg_y=results["leg_y"],
         underlying_price=underlying_price,
         std_dev_pct=std_dev,
         max_gain=results["max_gain"],
@@ -248,6 +338,7 @@ def main():
         i_max=results["i_max"],
         i_min=results["i_min"],
         legs=legs,
+        strikes_sorted=results["strikes_sorted"],
         toggles=toggles,
     )
 